@@ -5,9 +5,10 @@ from agents.analytical_agents import ValuationAgent, MomentumAgent, QualityAgent
 from agents.user_agents import UserProfilingAgent, ExpenseTrackingAgent
 from agents.portfolio_agents import PortfolioConstructionAgent, MetaController
 import json
-import ray
+import heapq
 from typing import Dict, List, Any
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,13 +17,19 @@ logger = logging.getLogger(__name__)
 class InvestmentAgent:
     """Enhanced investment advisor agent with multi-agent architecture"""
     
-    def __init__(self, use_ray: bool = False):
+    def __init__(self, use_ray: bool = False, market_data_ttl: int = 600):
         self.tools = InvestmentTools()
         self.use_ray = use_ray
         
-        # Initialize Ray if enabled
-        if self.use_ray and not ray.is_initialized():
-            ray.init(ignore_reinit_error=True)
+        # Market data is reused within a coarse time bucket of this many seconds
+        self.market_data_ttl = market_data_ttl
+        self._market_data_cache = None  # (bucket, market_data)
+        
+        # Initialize Ray if enabled (imported here so use_ray=False never loads it)
+        if self.use_ray:
+            import ray
+            if not ray.is_initialized():
+                ray.init(ignore_reinit_error=True)
         
         # Initialize agents
         self._initialize_agents()
@@ -131,6 +138,11 @@ class InvestmentAgent:
     
     def _collect_market_data(self) -> Dict:
         """Collect data from multiple sources using data agents"""
+        bucket = int(time.time()) // self.market_data_ttl
+        if self._market_data_cache and self._market_data_cache[0] == bucket:
+            logger.info("Using cached market data")
+            return self._market_data_cache[1]
+        
         market_data = {}
         
         try:
@@ -151,6 +163,7 @@ class InvestmentAgent:
             # Index data
             market_data['nifty_data'] = self.stock_agent.fetch_stock_data('^NSEI')
             
+            self._market_data_cache = (bucket, market_data)
             return market_data
             
         except Exception as e:
@@ -284,11 +297,11 @@ class InvestmentAgent:
         try:
             # Top stocks based on scores
             stock_scores = asset_scores.get('stocks', {})
-            sorted_stocks = sorted(
+            sorted_stocks = heapq.nlargest(
+                5,
                 stock_scores.items(),
-                key=lambda x: x[1]['aggregate_score'],
-                reverse=True
-            )[:5]
+                key=lambda x: x[1]['aggregate_score']
+            )
             
             recommendations['top_stocks'] = [
                 {
@@ -301,7 +314,7 @@ class InvestmentAgent:
             
             # Top mutual funds
             mf_scores = asset_scores.get('mutual_funds', {})
-            sorted_mfs = sorted(mf_scores.items(), key=lambda x: x[1], reverse=True)[:5]
+            sorted_mfs = heapq.nlargest(5, mf_scores.items(), key=lambda x: x[1])
             
             recommendations['top_mutual_funds'] = [
                 {'code': code, 'score': score}
@@ -431,8 +444,10 @@ RECOMMENDED ALLOCATION
     
     def cleanup(self):
         """Cleanup resources"""
-        if self.use_ray and ray.is_initialized():
-            ray.shutdown()
+        if self.use_ray:
+            import ray
+            if ray.is_initialized():
+                ray.shutdown()
 
 # Test functionality
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import yfinance as yf
 import requests
 import json
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from typing import Dict, List
 from datetime import datetime
 import logging
@@ -19,6 +19,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Parse only the price containers of each source instead of building the whole page tree
+_PRICE_STRAINERS = {
+    "investing": SoupStrainer("span", attrs={"data-test": "instrument-price-last"}),
+    "google": SoupStrainer("div", attrs={"data-last-price": True}),
+    "marketwatch": SoupStrainer(attrs={"class": "intraday__price"}),
+}
+
 
 class StockDataAgent:
     """Fetch stock data safely with caching and rate-limit protection"""
@@ -100,7 +107,7 @@ class StockDataAgent:
             if r.status_code in (401, 403, 429):
                 logger.warning(f"Screener.in blocked or rate-limited for {symbol}: {r.status_code}")
                 return {}
-            soup = BeautifulSoup(r.text, 'html.parser')
+            soup = BeautifulSoup(r.text, 'html.parser', parse_only=SoupStrainer(attrs={"class": "current-price"}))
             price = soup.select_one('.current-price')
             if price:
                 return {
@@ -121,7 +128,7 @@ class StockDataAgent:
             if r.status_code in (401, 403, 429):
                 logger.warning(f"Yahoo direct blocked or rate-limited for {symbol}: {r.status_code}")
                 return {}
-            soup = BeautifulSoup(r.text, 'html.parser')
+            soup = BeautifulSoup(r.text, 'html.parser', parse_only=SoupStrainer('fin-streamer'))
             price_elem = soup.find('fin-streamer', {'data-field': 'regularMarketPrice'})
             if not price_elem:
                 return {}
@@ -152,38 +159,52 @@ class StockDataAgent:
             "Pragma": "no-cache"
         }
 
-    async def _fetch_url(self, url: str, timeout: int = 10) -> str:
+    async def _fetch_url(self, session: aiohttp.ClientSession, url: str, timeout: int = 10) -> str:
         """Fetch URL with proper error handling and compression support"""
         try:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.get(url, timeout=timeout) as response:
-                    if response.status in (429, 403, 401):
-                        logger.warning(f"Rate limited: {url} ({response.status})")
-                        return ""
-                    
+            async with session.get(url, timeout=timeout) as response:
+                if response.status in (429, 403, 401):
+                    logger.warning(f"Rate limited: {url} ({response.status})")
+                    return ""
+                
+                content = await response.read()
+                
+
+                encoding = response.headers.get('Content-Encoding', '').lower()
+                if encoding == 'br':
+                    content = brotli.decompress(content)
+                elif encoding == 'gzip':
                     content = await response.read()
+                
+           
+                try:
+                    return content.decode('utf-8')
+                except UnicodeDecodeError:
+                    return content.decode('latin-1')
                     
- 
-                    encoding = response.headers.get('Content-Encoding', '').lower()
-                    if encoding == 'br':
-                        content = brotli.decompress(content)
-                    elif encoding == 'gzip':
-                        content = await response.read()
-                    
-               
-                    try:
-                        return content.decode('utf-8')
-                    except UnicodeDecodeError:
-                        return content.decode('latin-1')
-                        
         except Exception as e:
             logger.debug(f"Failed to fetch {url}: {e}")
             return ""
 
+    async def _fetch_price(self, session: aiohttp.ClientSession, url: str, source: str) -> float:
+        """Fetch one source page and parse its price off the event loop"""
+        html = await self._fetch_url(session, url)
+        if not html:
+            return 0
+        # Parsing is CPU-bound; a worker thread lets the other downloads keep going
+        return await asyncio.to_thread(self._parse_price_from_html, html, source)
+
+    async def _fetch_prices(self, urls: List[tuple]) -> List[float]:
+        """Fetch and parse all (url, source) pairs concurrently over one shared session"""
+        async with aiohttp.ClientSession(headers=self.headers) as session:
+            return await asyncio.gather(
+                *[self._fetch_price(session, url, source) for url, source in urls]
+            )
+
     def _parse_price_from_html(self, html: str, source: str) -> float:
         """Extract price from HTML based on source"""
         try:
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = BeautifulSoup(html, 'html.parser', parse_only=_PRICE_STRAINERS.get(source))
             if source == "investing":
                 price_elem = soup.select_one("span[data-test='instrument-price-last']")
             elif source == "google":
@@ -203,7 +224,7 @@ class StockDataAgent:
 
         if symbol in self.cache:
             cached, timestamp = self.cache[symbol]
-            if (datetime.now() - timestamp).seconds < self.cache_duration:
+            if time.monotonic() - timestamp < self.cache_duration:
                 logger.debug(f"Cache hit for {symbol}")
                 return cached
 
@@ -219,30 +240,20 @@ class StockDataAgent:
         for attempt in range(self.max_retries):
             try:
                 
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 urls = [(url_template.format(slug), source) for url_template, source, slug in sources]
-                responses = loop.run_until_complete(
-                    asyncio.gather(
-                        *[self._fetch_url(url) for url, _ in urls]
-                    )
-                )
-                loop.close()
+                prices = asyncio.run(self._fetch_prices(urls))
                 
                 
-                for html, (_, source) in zip(responses, urls):
-                    if html:
-                        price = self._parse_price_from_html(html, source)
-                        if price > 0:
-                            data = {
-                                "symbol": symbol,
-                                "current_price": price,
-                                "timestamp": datetime.now().isoformat()
-                            }
-                            self.cache[symbol] = (data, datetime.now())
-                            logger.info(f" Fetched {symbol} via {source}")
-                            return data
+                for price, (_, source) in zip(prices, urls):
+                    if price > 0:
+                        data = {
+                            "symbol": symbol,
+                            "current_price": price,
+                            "timestamp": datetime.now().isoformat()
+                        }
+                        self.cache[symbol] = (data, time.monotonic())
+                        logger.info(f" Fetched {symbol} via {source}")
+                        return data
                             
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {e}")
@@ -1,5 +1,6 @@
 # agents/portfolio_agents.py - Layer 6: Portfolio Construction & Control
 from typing import Dict, List, Tuple
+import heapq
 import logging
 
 logger = logging.getLogger(__name__)
@@ -87,17 +88,15 @@ class PortfolioConstructionAgent:
         try:
             # Select top stocks based on scores
             stock_scores = asset_scores.get('stocks', {})
-            sorted_stocks = sorted(
-                stock_scores.items(),
-                key=lambda x: x[1]['aggregate_score'],
-                reverse=True
-            )
-            
             equity_amount = allocation.get('Equity', 0)
             
             # Allocate to top 5-7 stocks
             num_stocks = 5 if risk_profile == 'Conservative' else 7
-            top_stocks = sorted_stocks[:num_stocks]
+            top_stocks = heapq.nlargest(
+                num_stocks,
+                stock_scores.items(),
+                key=lambda x: x[1]['aggregate_score']
+            )
             
             if top_stocks:
                 amount_per_stock = equity_amount * 0.6 / len(top_stocks)  # 60% in stocks
@@ -110,10 +109,8 @@ class PortfolioConstructionAgent:
             
             # Allocate remaining equity to mutual funds
             mf_scores = asset_scores.get('mutual_funds', {})
-            sorted_mfs = sorted(mf_scores.items(), key=lambda x: x[1], reverse=True)
-            
             num_mfs = 3
-            top_mfs = sorted_mfs[:num_mfs]
+            top_mfs = heapq.nlargest(num_mfs, mf_scores.items(), key=lambda x: x[1])
             
             if top_mfs:
                 amount_per_mf = equity_amount * 0.4 / len(top_mfs)  # 40% in MFs
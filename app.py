@@ -1,25 +1,26 @@
 # app.py - Enhanced Streamlit Application with MarketWatch integration and Session State
 import os
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
 from agent import InvestmentAgent
-from database import insert_user, get_all_users
+from database import insert_user, get_users_page, get_user_stats
 import pandas as pd
-import plotly.graph_objects as go
 import yfinance as yf
 from datetime import datetime
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as FutureTimeoutError, wait
 import re
+import json
 import time
+import threading
+import bisect
+import heapq
 
-st.set_page_config(
-    page_title="MoneyMind:AI Investment Advisor - Multi-Agent System",
-    page_icon=None,
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-st.markdown("""
+# Display constants. Streamlit re-executes this script's module scope on every
+# rerun, so these are still rebuilt each run; they live here to keep the page code short
+_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -47,63 +48,110 @@ st.markdown("""
         background-color: #f8f9fa;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-@st.cache_resource
-def get_agent():
-    return InvestmentAgent(use_ray=False)
+# Strips everything but digits and the decimal point from a scraped price
+_PRICE_RE = re.compile(r'[^\d.]')
 
-agent = get_agent()
+# Unit conversion and sanity bounds for fetched quotes
+_OZ_TO_G = 31.1034768  # grams per troy ounce
+_NIFTY_MIN = 10000
+_GOLD_MIN_INR_10G = 30000
+_USD_INR_MIN, _USD_INR_MAX = 70, 100
+_USD_INR_DEFAULT = 83.0  # approximate rate when no source answers
 
-# Cache market data for 5 minutes to avoid excessive requests
-@st.cache_data(ttl=300)
-def fetch_from_marketwatch(url, price_selectors):
-    """Helper function to fetch and parse data from MarketWatch"""
-    headers = {
+_PIE_COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728')
+
+# Life stage by age: below 35, below 50, 50 and above
+_LIFE_STAGE_CUTOFFS = (35, 50)
+_LIFE_STAGES = ("Early Career", "Mid Career", "Pre-Retirement")
+
+
+# Pooled keep-alive session for MarketWatch and API calls, with retry on transient errors.
+# Held by cache_resource so one session outlives reruns and is shared by every session
+# (a plain module global would be rebuilt each time Streamlit re-executes this script)
+@st.cache_resource(show_spinner=False)
+def _http_session():
+    session = requests.Session()
+    session.headers.update({
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
-        'Connection': 'keep-alive',
-    }
-    
+    })
+    session.mount("https://", HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+    ))
+    return session
+
+
+st.set_page_config(
+    page_title="MoneyMind:AI Investment Advisor - Multi-Agent System",
+    page_icon=None,
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+st.markdown(_CSS, unsafe_allow_html=True)
+
+# One agent per session: it keeps its own market-data cache, so sharing it
+# across users would have concurrent sessions racing on that state
+if "agent" not in st.session_state:
+    st.session_state.agent = InvestmentAgent(use_ray=False)
+agent = st.session_state.agent
+
+# Cache market data for 5 minutes to avoid excessive requests
+# (no spinner: this runs on the market-data worker threads)
+@st.cache_data(ttl=300, show_spinner=False, max_entries=64)
+def fetch_from_marketwatch(url, price_selectors):
+    """
+    Helper function to fetch and parse data from MarketWatch
+    Probes run cheapest first and each returns on the first valid price:
+    selectors -> meta tag -> JSON-LD. Keep the script scan last so it only
+    runs when the page has no price element.
+    """
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = _http_session().get(url, timeout=15)
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # selectolax's C parser handles the page far faster than BeautifulSoup's html.parser
+            from selectolax.parser import HTMLParser
+            tree = HTMLParser(response.text)
             
-            # Try multiple selectors
-            for selector in price_selectors:
-                # Try class selector
-                price_elem = soup.find(class_=selector)
-                if price_elem:
-                    price_text = price_elem.get_text().strip()
-                    price_clean = re.sub(r'[^\d.]', '', price_text)
-                    if price_clean and float(price_clean) > 0:
-                        return float(price_clean)
-                
-                # Try data attribute selector
-                price_elem = soup.find(attrs={'data-test': selector})
-                if price_elem:
-                    price_text = price_elem.get_text().strip()
-                    price_clean = re.sub(r'[^\d.]', '', price_text)
-                    if price_clean and float(price_clean) > 0:
-                        return float(price_clean)
+            # Match every selector as a class or a data-test attribute in one pass over
+            # the tree, taking the first positive price in document order
+            query = ", ".join(
+                f'.{selector}, [data-test="{selector}"]' for selector in price_selectors
+            )
+            for price_elem in tree.css(query):
+                try:
+                    price = float(_PRICE_RE.sub('', price_elem.text()))
+                except ValueError:  # nothing numeric left
+                    continue
+                if price > 0:
+                    return price
             
             # Try meta tags
-            meta_price = soup.find('meta', {'name': 'price'})
-            if meta_price and meta_price.get('content'):
-                return float(meta_price['content'])
+            meta_price = tree.css_first('meta[name="price"]')
+            if meta_price is not None and meta_price.attributes.get('content'):
+                try:
+                    price = float(meta_price.attributes['content'])
+                except ValueError:
+                    price = 0.0
+                if price > 0:
+                    return price
             
-            # Try structured data (JSON-LD)
-            scripts = soup.find_all('script', type='application/ld+json')
-            for script in scripts:
+            # Try structured data (JSON-LD); price data sits in the first few blocks
+            scripts = tree.css('script[type="application/ld+json"]')
+            for script in scripts[:5]:
                 try:
-                    import json
-                    data = json.loads(script.string)
+                    data = json.loads(script.text())
                     if isinstance(data, dict) and 'price' in data:
-                        return float(data['price'])
-                except:
+                        price = float(data['price'])
+                        if price > 0:
+                            return price
+                except (ValueError, TypeError):  # malformed JSON or non-numeric price
                     continue
                     
     except Exception as e:
@@ -112,6 +160,8 @@ def fetch_from_marketwatch(url, price_selectors):
     return None
 
 
+# Cached as a whole so the yfinance fallback isn't repeated on every call either
+@st.cache_data(ttl=300, show_spinner=False)
 def get_usd_inr_rate():
     """Fetch USD to INR exchange rate from MarketWatch"""
     
@@ -120,7 +170,7 @@ def get_usd_inr_rate():
         "https://www.marketwatch.com/investing/currency/usdinr",
         ['bg-quote', 'value', 'intraday__price', 'lastprice']
     )
-    if rate and rate > 70 and rate < 100:  # Sanity check
+    if rate and _USD_INR_MIN < rate < _USD_INR_MAX:  # Sanity check
         return rate
     
     # Try yfinance as fallback
@@ -129,13 +179,13 @@ def get_usd_inr_rate():
         hist = ticker.history(period="1d")
         if not hist.empty:
             rate = float(hist['Close'].iloc[-1])
-            if rate > 70 and rate < 100:
+            if _USD_INR_MIN < rate < _USD_INR_MAX:
                 return rate
     except:
         pass
     
     # Fallback to approximate rate
-    return 83.0
+    return _USD_INR_DEFAULT
 
 
 def get_nifty_from_marketwatch():
@@ -147,8 +197,11 @@ def get_nifty_from_marketwatch():
     return price if price else None
 
 
-def get_gold_from_marketwatch():
-    """Fetch Gold price from MarketWatch and convert to INR per 10g"""
+def get_gold_from_marketwatch(usd_inr_future=None):
+    """
+    Fetch Gold price from MarketWatch and convert to INR per 10g
+    usd_inr_future optionally carries a USD/INR rate the caller is already fetching
+    """
     # Fetch gold in USD per oz
     gold_usd_per_oz = fetch_from_marketwatch(
         "https://www.marketwatch.com/investing/future/gc00",
@@ -157,11 +210,13 @@ def get_gold_from_marketwatch():
     
     if gold_usd_per_oz:
         # Get USD to INR rate
-        usd_inr = get_usd_inr_rate()
+        if usd_inr_future is not None:
+            usd_inr = usd_inr_future.result()
+        else:
+            usd_inr = get_usd_inr_rate()
         
         # Convert to INR per 10g
-        # 1 troy oz = 31.1034768 grams
-        gold_per_gram = (gold_usd_per_oz * usd_inr) / 31.1034768
+        gold_per_gram = (gold_usd_per_oz * usd_inr) / _OZ_TO_G
         gold_per_10g = gold_per_gram * 10.0
         
         return gold_per_10g
@@ -169,155 +224,326 @@ def get_gold_from_marketwatch():
     return None
 
 
-def get_market_data():
-    """
-    Enhanced market data fetcher - MarketWatch primary source
-    Priority: MarketWatch -> yfinance -> GoldAPI
-    """
-    result = {
-        "status": "error",
-        "nifty_50": 0.0,
-        "gold_price": 0.0,
-        "market_sentiment": "Neutral",
-        "macro_indicators": {},
-        "data_source": "",
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
+# Upper bound on how long a market-data fetch waits for its upstream chains (seconds)
+_CHAIN_TIMEOUT = 8
+
+# GoldAPI circuit breaker: after 3 consecutive failures, skip it for 10 minutes
+# (longer than the 5-minute market-data TTL, so the next refresh really skips it)
+_BREAKER_MAX_FAILS = 3
+_BREAKER_COOLDOWN = 600
+
+
+# Held by cache_resource so the failure count survives reruns and is shared by
+# every session; the lock guards updates from the market-data worker threads
+@st.cache_resource(show_spinner=False)
+def _goldapi_breaker():
+    return {"fails": 0, "open_until": 0.0, "lock": threading.Lock()}
+
 
+# Memoize yfinance closes across reruns and sessions (symbols must be a tuple)
+@st.cache_data(ttl=300, show_spinner=False)
+def _yf_last_closes(symbols):
+    """Last daily close per symbol from a single batched yfinance download"""
+    data = yf.download(
+        list(symbols), period="2d", interval="1d",
+        group_by="ticker", threads=True, progress=False, timeout=4
+    )
+    closes = {}
+    for symbol in symbols:
+        try:
+            # A single-symbol download comes back without the ticker level
+            frame = data[symbol] if data.columns.nlevels > 1 else data
+            close = frame['Close'].dropna()
+        except KeyError:
+            continue
+        if not close.empty:
+            closes[symbol] = float(close.iloc[-1])
+    return closes
+
+
+def _fetch_nifty():
+    """Nifty 50 chain: MarketWatch -> yfinance fast_info. Returns (price, source)"""
     # 1. Try MarketWatch for Nifty 50
     try:
         nifty_price = get_nifty_from_marketwatch()
-        if nifty_price and nifty_price > 10000:  # Sanity check
-            result["nifty_50"] = float(nifty_price)
-            result["data_source"] = "MarketWatch"
+        if nifty_price and nifty_price > _NIFTY_MIN:  # Sanity check
+            return float(nifty_price), "MarketWatch"
     except Exception as e:
         print(f"MarketWatch Nifty error: {e}")
 
-    # 2. Try yfinance for Nifty 50 if MarketWatch failed
-    if result["nifty_50"] == 0.0:
-        try:
-            ticker = yf.Ticker("^NSEI")
-            nifty_price = None
-            
-            # Try info first
-            try:
-                info = ticker.info or {}
-                for key in ("regularMarketPrice", "previousClose", "currentPrice"):
-                    if info.get(key):
-                        nifty_price = float(info[key])
-                        break
-            except:
-                pass
-            
-            # Try history if info failed
-            if nifty_price is None:
-                hist = ticker.history(period="1d", interval="1m")
-                if not hist.empty:
-                    nifty_price = float(hist['Close'].iloc[-1])
+    # 2. Try yfinance fast_info (prices from the chart history, which is lighter than
+    # .info's quote-summary scrape but still a ~1-year download)
+    try:
+        # Fresh Ticker on purpose: fast_info caches its quote on the object
+        fi = yf.Ticker("^NSEI").fast_info
+        nifty_price = getattr(fi, "last_price", None) or getattr(fi, "previous_close", None)
+        if nifty_price and nifty_price > _NIFTY_MIN:
+            return float(nifty_price), "Yahoo Finance"
+    except Exception as e:
+        print(f"yfinance Nifty error: {e}")
+
+    # History fallback is batched with gold in get_market_data
+    return 0.0, ""
+
+
+def _fetch_goldapi(api_key):
+    """Fetch XAU/INR from GoldAPI and convert to INR per 10g (None on failure)"""
+    breaker = _goldapi_breaker()
+    with breaker["lock"]:
+        if time.monotonic() < breaker["open_until"]:
+            return None
+    
+    gold_per_10g = _request_goldapi(api_key)
+    with breaker["lock"]:
+        if gold_per_10g is None:
+            breaker["fails"] += 1
+            if breaker["fails"] >= _BREAKER_MAX_FAILS:
+                breaker["fails"] = 0
+                breaker["open_until"] = time.monotonic() + _BREAKER_COOLDOWN
+        else:
+            breaker["fails"] = 0
+    return gold_per_10g
+
+
+def _request_goldapi(api_key):
+    """Single GoldAPI request, INR per 10g or None"""
+    try:
+        # (connect, read) timeouts: a degraded GoldAPI should not hold up the rerun
+        resp = _http_session().get(
+            "https://www.goldapi.io/api/XAU/INR",
+            headers={"x-access-token": api_key, "Content-Type": "application/json"},
+            timeout=(2, 4)
+        )
+        if resp.status_code == 200:
+            j = resp.json()
+            price = None
+            if 'price' in j:
+                price = float(j['price'])
+            elif 'ask' in j:
+                price = float(j['ask'])
             
-            if nifty_price and nifty_price > 10000:
-                result["nifty_50"] = float(nifty_price)
-                if not result["data_source"]:
-                    result["data_source"] = "Yahoo Finance"
-        except Exception as e:
-            print(f"yfinance Nifty error: {e}")
+            unit = (j.get('unit') or "").lower()
+            if price is not None:
+                if 'oz' in unit:
+                    per_gram = price / _OZ_TO_G
+                else:
+                    per_gram = price
+                gold_per_10g = per_gram * 10.0
+                
+                if gold_per_10g > _GOLD_MIN_INR_10G:
+                    return float(gold_per_10g)
+    except Exception as e:
+        print(f"GoldAPI error: {e}")
+    
+    return None
 
+
+def _fetch_gold(goldapi_key=None, usd_inr_future=None):
+    """
+    Gold chain: MarketWatch -> GoldAPI. Returns (INR per 10g, source)
+    USD/INR is requested by the caller up front so it overlaps the MarketWatch
+    gold scrape; the metered GoldAPI is only called when that scrape misses
+    """
     # 3. Try MarketWatch for Gold
     try:
-        gold_price = get_gold_from_marketwatch()
-        if gold_price and gold_price > 30000:  # Sanity check (INR per 10g)
-            result["gold_price"] = float(gold_price)
-            if result["data_source"] == "MarketWatch":
-                result["data_source"] = "MarketWatch"
-            elif not result["data_source"]:
-                result["data_source"] = "MarketWatch (Gold)"
+        gold_price = get_gold_from_marketwatch(usd_inr_future)
+        if gold_price and gold_price > _GOLD_MIN_INR_10G:  # Sanity check (INR per 10g)
+            return float(gold_price), "MarketWatch (Gold)"
     except Exception as e:
         print(f"MarketWatch Gold error: {e}")
 
-    # 4. Try GoldAPI if available
-    if result["gold_price"] == 0.0:
-        GOLDAPI_KEY = os.getenv("GOLDAPI_KEY")
-        if GOLDAPI_KEY:
-            try:
-                resp = requests.get(
-                    "https://www.goldapi.io/api/XAU/INR",
-                    headers={"x-access-token": GOLDAPI_KEY, "Content-Type": "application/json"},
-                    timeout=10
-                )
-                if resp.status_code == 200:
-                    j = resp.json()
-                    price = None
-                    if 'price' in j:
-                        price = float(j['price'])
-                    elif 'ask' in j:
-                        price = float(j['ask'])
-                    
-                    unit = (j.get('unit') or "").lower()
-                    if price is not None:
-                        if 'oz' in unit:
-                            per_gram = price / 31.1034768
-                        else:
-                            per_gram = price
-                        gold_per_10g = per_gram * 10.0
-                        
-                        if gold_per_10g > 30000:
-                            result["gold_price"] = float(gold_per_10g)
-                            if not result["data_source"]:
-                                result["data_source"] = "GoldAPI"
-            except Exception as e:
-                print(f"GoldAPI error: {e}")
+    # 4. Use GoldAPI if a key is configured
+    if goldapi_key:
+        gold_per_10g = _fetch_goldapi(goldapi_key)
+        if gold_per_10g:
+            return gold_per_10g, "GoldAPI"
+
+    # yfinance fallback is batched with Nifty in get_market_data
+    return 0.0, ""
+
+
+def get_market_data():
+    """
+    Enhanced market data fetcher - MarketWatch primary source
+    Priority: MarketWatch -> yfinance -> GoldAPI
+    The Nifty chain, the gold chain and USD/INR run concurrently
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    goldapi_key = os.getenv("GOLDAPI_KEY")
+    executor = ThreadPoolExecutor(max_workers=3)
+    usd_inr_future = executor.submit(get_usd_inr_rate)
+    nifty_future = executor.submit(_fetch_nifty)
+    gold_future = executor.submit(_fetch_gold, goldapi_key, usd_inr_future)
+    # One deadline covers every wait below; a chain that overruns it is abandoned
+    # and left to the yfinance fallback
+    deadline = time.monotonic() + _CHAIN_TIMEOUT
+    wait((nifty_future, gold_future), timeout=_CHAIN_TIMEOUT)
+    if nifty_future.done():
+        nifty_price, nifty_source = nifty_future.result()
+    else:
+        print("Nifty chain timed out")
+        nifty_price, nifty_source = 0.0, ""
+    if gold_future.done():
+        gold_price, gold_source = gold_future.result()
+    else:
+        print("Gold chain timed out")
+        gold_price, gold_source = 0.0, ""
+    # Don't block on stragglers; they finish (or time out) in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    # Fast path: both primary chains delivered
+    if nifty_price and gold_price:
+        return _market_data_result(nifty_price, nifty_source, gold_price, gold_source, timestamp)
 
-    # 5. Try yfinance for Gold as last resort
-    if result["gold_price"] == 0.0:
+    # 5. Fill whatever is still missing from one batched yfinance download
+    missing = ()
+    if not nifty_price:
+        missing += ("^NSEI",)
+    if not gold_price:
+        missing += ("GC=F",)
+        # If the USD/INR lookup is still running, fetch the rate in the same download
+        # in case it doesn't finish before the deadline
+        if not usd_inr_future.done():
+            missing += ("INR=X",)
+    if missing:
         try:
-            gold_ticker = yf.Ticker("GC=F")
-            hist = gold_ticker.history(period="1d")
-            if not hist.empty:
-                gold_price_oz = float(hist['Close'].iloc[-1])
-                
-                # Get USD to INR rate
-                usd_inr = get_usd_inr_rate()
+            closes = _yf_last_closes(missing)
+            
+            yf_nifty = closes.get("^NSEI")
+            if yf_nifty and yf_nifty > _NIFTY_MIN:
+                nifty_price, nifty_source = yf_nifty, "Yahoo Finance"
+            
+            gold_price_oz = closes.get("GC=F")
+            if gold_price_oz:
+                # Reuse the USD/INR rate prefetched with the gold chain, within what is
+                # left of the deadline
+                try:
+                    usd_inr = usd_inr_future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except (FutureTimeoutError, CancelledError):
+                    # A slow lookup is not a failed one: use the downloaded rate, and
+                    # leave gold unpriced rather than assume the fixed default
+                    usd_inr = closes.get("INR=X")
+                    if not (usd_inr and _USD_INR_MIN < usd_inr < _USD_INR_MAX):
+                        usd_inr = None
                 
-                if gold_price_oz and usd_inr:
-                    per_gram = (gold_price_oz * usd_inr) / 31.1034768
-                    gold_per_10g = per_gram * 10.0
-                    
-                    if gold_per_10g > 30000:
-                        result["gold_price"] = float(gold_per_10g)
-                        if not result["data_source"]:
-                            result["data_source"] = "Yahoo Finance"
+                if usd_inr:
+                    gold_per_10g = (gold_price_oz * usd_inr) / _OZ_TO_G * 10.0
+                    if gold_per_10g > _GOLD_MIN_INR_10G:
+                        gold_price, gold_source = float(gold_per_10g), "Yahoo Finance"
         except Exception as e:
-            print(f"yfinance Gold error: {e}")
+            print(f"yfinance fallback error: {e}")
+
+    return _market_data_result(nifty_price, nifty_source, gold_price, gold_source, timestamp)
 
-    # Update status
-    if result["nifty_50"] > 0 or result["gold_price"] > 0:
-        result["status"] = "success"
-    else:
-        result["status"] = "error"
-        result["data_source"] = "No data available"
 
-    return result
+def _market_data_result(nifty_price, nifty_source, gold_price, gold_source, timestamp):
+    """Build the market data dict once from the resolved values"""
+    has_data = nifty_price > 0 or gold_price > 0
+    return {
+        "status": "success" if has_data else "error",
+        "nifty_50": nifty_price,
+        "gold_price": gold_price,
+        "market_sentiment": "Neutral",
+        "macro_indicators": {},
+        # Nifty's source takes precedence, as it did when the chains ran in order
+        "data_source": (nifty_source or gold_source) if has_data else "No data available",
+        "timestamp": timestamp
+    }
 
 
+# Share live quotes across reruns and sessions for 5 minutes
+# (no spinner: the generate branch calls this from a worker thread)
+@st.cache_data(ttl=300, show_spinner=False)
 def get_cached_market_data():
     """
-    Get market data from session state or fetch new data
-    This ensures consistent data across the entire session
+    Get market data, fetched at most once every 5 minutes server-wide
+    This ensures consistent data across sessions
     """
-    if 'market_data' not in st.session_state or 'market_data_timestamp' not in st.session_state:
-        # Fetch fresh data
-        st.session_state['market_data'] = get_market_data()
-        st.session_state['market_data_timestamp'] = datetime.now()
-    else:
-        # Check if data is older than 5 minutes
-        time_diff = (datetime.now() - st.session_state['market_data_timestamp']).total_seconds()
-        if time_diff > 300:  # 5 minutes
-            st.session_state['market_data'] = get_market_data()
-            st.session_state['market_data_timestamp'] = datetime.now()
-    
-    return st.session_state['market_data']
+    return get_market_data()
+
+
+async def _analyze_with_market_data(user_data):
+    """Run the agent pipeline while the market data cache is warmed alongside it"""
+    analysis, _ = await asyncio.gather(
+        asyncio.to_thread(agent.analyze_profile, user_data),
+        asyncio.to_thread(get_cached_market_data)
+    )
+    return analysis
+
+
+# Rows per page in the saved-profiles table (newest first)
+_PROFILE_PAGE_SIZE = 50
+
+
+# Short TTL picks up profiles written by other sessions; our own inserts clear it
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_users_page(offset, limit):
+    """
+    One page of saved profiles as a DataFrame (newest first), cached until the
+    next insert clears it or the TTL expires
+    """
+    return pd.DataFrame(
+        get_users_page(offset, limit),
+        columns=["ID", "Name", "Income", "Expenses", "Savings", "Risk Profile", "Date"]
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_user_stats():
+    """Profile statistics aggregated by the database, cached like the profile pages"""
+    return get_user_stats()
 
 
+def _clear_profile_caches():
+    _cached_users_page.clear()
+    _cached_user_stats.clear()
+
+
+# Chart builders are cached on their (tuple) inputs so a repeated plan reuses the figures
+@st.cache_data(ttl=600, show_spinner=False)
+def _build_allocation_pie(labels, values):
+    import plotly.graph_objects as go
+    fig = go.Figure(data=[go.Pie(
+        labels=list(labels),
+        values=list(values),
+        hole=0.4,
+        marker_colors=_PIE_COLORS
+    )])
+    fig.update_layout(
+        title="Asset Allocation (%)",
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _build_amount_bar(assets, amounts):
+    import plotly.graph_objects as go
+    fig = go.Figure(data=[go.Bar(
+        x=list(assets),
+        y=list(amounts),
+        marker_color='#1f77b4'
+    )])
+    fig.update_layout(
+        title="Investment Amount (Rs)",
+        yaxis_title="Amount",
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _build_top_stocks_bar(symbols, scores):
+    import plotly.graph_objects as go
+    fig = go.Figure(data=[go.Bar(x=list(symbols), y=list(scores), marker_color='lightblue')])
+    fig.update_layout(title="Top 5 Stocks by AI Score", yaxis_title="Score (0-1)")
+    return fig
+
+
+# Today's date, formatted once per rerun
+_TODAY = datetime.now().strftime('%Y-%m-%d')
+
 st.markdown('<div class="main-header">MoneyMind:AI-Powered Investment Advisor</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Multi-Agent Intelligence System for Personalized Wealth Management</div>', unsafe_allow_html=True)
 st.markdown("---")
@@ -375,40 +601,33 @@ if generate_plan and name.strip():
         "risk_tolerance": risk_tolerance
     }
     
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    status_text.text("Initializing AI agents...")
-    progress_bar.progress(10)
-    time.sleep(0.3)
-    
-    status_text.text("Analyzing your profile...")
-    progress_bar.progress(20)
-    time.sleep(0.3)
+    # Re-pressing Generate with unchanged inputs reuses the last run
+    analysis_key = hash(tuple(sorted(user_data.items())))
+    cached_run = st.session_state.get('analysis_cache', {}).get(analysis_key)
     
-    status_text.text("Collecting market data from MarketWatch...")
-    progress_bar.progress(40)
+    if cached_run is not None:
+        analysis = cached_run
+    else:
+        progress_bar = st.progress(0)
+        status_text = st.empty()
     
-    # Fetch market data ONCE and store in session state
-    market_data = get_cached_market_data()
+        status_text.text("Analyzing your profile and collecting market data...")
+        progress_bar.progress(40)
     
-    with st.spinner('AI agents are analyzing thousands of investment options...'):
-        analysis = agent.analyze_profile(user_data)
+        with st.spinner('AI agents are analyzing thousands of investment options...'):
+            analysis = asyncio.run(_analyze_with_market_data(user_data))
     
-    status_text.text("Scoring assets...")
-    progress_bar.progress(60)
-    time.sleep(0.3)
+        status_text.text("Finalizing recommendations...")
+        progress_bar.progress(100)
     
-    status_text.text("Constructing optimal portfolio...")
-    progress_bar.progress(80)
-    time.sleep(0.3)
+        progress_bar.empty()
+        status_text.empty()
     
-    status_text.text("Finalizing recommendations...")
-    progress_bar.progress(100)
-    time.sleep(0.2)
+        st.session_state['analysis_cache'] = {analysis_key: analysis}
     
-    progress_bar.empty()
-    status_text.empty()
+    # Quotes are not kept with the analysis so they still follow the 5-minute TTL and
+    # the refresh button; after a fresh analysis this is a cache hit
+    market_data = get_cached_market_data()
     
     st.success("AI Analysis Complete!")
     
@@ -481,7 +700,7 @@ if generate_plan and name.strip():
         
         with col2:
             st.subheader("Investment Goals")
-            life_stage = "Early Career" if age < 35 else ("Mid Career" if age < 50 else "Pre-Retirement")
+            life_stage = _LIFE_STAGES[bisect.bisect_right(_LIFE_STAGE_CUTOFFS, age)]
             st.markdown(f"**Life Stage:** {life_stage}")
             st.markdown("**Suggested Goals:**")
             goals = [
@@ -502,42 +721,34 @@ if generate_plan and name.strip():
         col1, col2 = st.columns([1, 1])
         
         with col1:
-            fig = go.Figure(data=[go.Pie(
-                labels=list(strategic_pct.keys()),
-                values=list(strategic_pct.values()),
-                hole=0.4,
-                marker_colors=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-            )])
-            fig.update_layout(
-                title="Asset Allocation (%)",
-                height=400
-            )
+            fig = _build_allocation_pie(tuple(strategic_pct.keys()), tuple(strategic_pct.values()))
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            fig = go.Figure(data=[go.Bar(
-                x=list(allocation.keys()),
-                y=list(allocation.values()),
-                marker_color='#1f77b4'
-            )])
-            fig.update_layout(
-                title="Investment Amount (Rs)",
-                yaxis_title="Amount",
-                height=400
-            )
+            fig = _build_amount_bar(tuple(allocation.keys()), tuple(allocation.values()))
             st.plotly_chart(fig, use_container_width=True)
         
         st.subheader("Detailed Allocation")
-        allocation_df = pd.DataFrame([
-            {
-                "Asset Class": asset,
-                "Amount (Rs)": f"Rs{amount:,.0f}",
-                "Percentage": f"{strategic_pct[asset]}%",
-                "Monthly SIP": f"Rs{amount:,.0f}"
-            }
-            for asset, amount in allocation.items()
-        ])
-        st.dataframe(allocation_df, use_container_width=True, hide_index=True)
+        # Build numeric columns rather than row dicts; the Styler formats them for display
+        assets = list(allocation)
+        amounts = list(allocation.values())
+        allocation_df = pd.DataFrame({
+            "Asset Class": assets,
+            "Amount (Rs)": amounts,
+            "Percentage": [strategic_pct[asset] for asset in assets],
+            "Monthly SIP": amounts
+        })
+        st.dataframe(
+            allocation_df.style.format({
+                "Amount (Rs)": "Rs{:,.0f}",
+                "Monthly SIP": "Rs{:,.0f}",
+                "Percentage": "{}%"
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        # Charts and tables are serialized as soon as they are emitted, so drop them
+        del fig, allocation_df
         
         st.subheader("Portfolio Metrics")
         col1, col2, col3 = st.columns(3)
@@ -566,46 +777,54 @@ if generate_plan and name.strip():
         stock_scores = asset_scores.get('stocks', {})
         
         if stock_scores:
-            stock_data = []
-            for symbol, data in sorted(
-                stock_scores.items(),
-                key=lambda x: x[1]['aggregate_score'],
-                reverse=True
-            )[:10]:
-                individual = data['individual_scores']
-                stock_data.append({
-                    'Symbol': symbol.replace('.NS', ''),
-                    'Score': f"{data['aggregate_score']:.2f}",
-                    'Valuation': f"{individual.get('valuation', 0):.2f}",
-                    'Momentum': f"{individual.get('momentum', 0):.2f}",
-                    'Quality': f"{individual.get('quality', 0):.2f}",
-                    'Risk': f"{individual.get('risk', 0):.2f}"
-                })
-            
-            st.dataframe(pd.DataFrame(stock_data), use_container_width=True, hide_index=True)
+            # Rank once, then one numeric frame feeds both the table and the top-5 chart
+            top_10 = heapq.nlargest(10, stock_scores.items(), key=lambda x: x[1]['aggregate_score'])
+            stock_df = pd.DataFrame.from_dict(
+                {
+                    symbol.replace('.NS', ''): {
+                        'Score': data['aggregate_score'],
+                        **{factor.title(): data['individual_scores'].get(factor, 0)
+                           for factor in ('valuation', 'momentum', 'quality', 'risk')}
+                    }
+                    for symbol, data in top_10
+                },
+                orient='index'
+            )
+            stock_df.index.name = 'Symbol'
             
-            top_5 = list(stock_scores.items())[:5]
-            symbols = [s[0].replace('.NS', '') for s in top_5]
-            scores = [s[1]['aggregate_score'] for s in top_5]
+            # Scores stay numeric; the column config formats them in the browser
+            st.dataframe(
+                stock_df.reset_index(),
+                column_config={
+                    factor: st.column_config.NumberColumn(format="%.2f") for factor in stock_df.columns
+                },
+                use_container_width=True,
+                hide_index=True
+            )
             
-            fig = go.Figure(data=[go.Bar(x=symbols, y=scores, marker_color='lightblue')])
-            fig.update_layout(title="Top 5 Stocks by AI Score", yaxis_title="Score (0-1)")
+            top_5 = stock_df.head(5)
+            fig = _build_top_stocks_bar(tuple(top_5.index), tuple(top_5['Score']))
             st.plotly_chart(fig, use_container_width=True)
+            del fig, stock_df, top_5
         
         st.subheader("Top Mutual Funds")
         mf_scores = asset_scores.get('mutual_funds', {})
         
         if mf_scores:
-            mf_data = []
-            for code, score in sorted(mf_scores.items(), key=lambda x: x[1], reverse=True)[:5]:
-                stars = '*' * int(score * 5)
-                mf_data.append({
-                    'Scheme Code': code,
-                    'Score': f"{score:.2f}",
-                    'Rating': stars
-                })
+            top_mf = heapq.nlargest(5, mf_scores.items(), key=lambda x: x[1])
+            mf_data = pd.DataFrame({
+                'Scheme Code': [code for code, _ in top_mf],
+                'Score': [score for _, score in top_mf],
+                'Rating': ['*' * int(score * 5) for _, score in top_mf]
+            })
             
-            st.dataframe(pd.DataFrame(mf_data), use_container_width=True, hide_index=True)
+            st.dataframe(
+                mf_data,
+                column_config={"Score": st.column_config.NumberColumn(format="%.2f")},
+                use_container_width=True,
+                hide_index=True
+            )
+            del mf_data
     
     with tab4:
         st.header("AI-Powered Recommendations")
@@ -616,15 +835,21 @@ if generate_plan and name.strip():
         top_stocks = recommendations.get('top_stocks', [])
         
         if top_stocks:
-            for i, stock in enumerate(top_stocks[:5], 1):
-                with st.container():
-                    col1, col2, col3 = st.columns([2, 1, 3])
-                    with col1:
-                        st.markdown(f"**{i}. {stock['symbol'].replace('.NS', '')}**")
-                    with col2:
-                        st.metric("AI Score", f"{stock['score']:.2f}")
-                    with col3:
-                        st.caption(stock.get('reason', 'AI recommended'))
+            # One table instead of a row of columns/metrics per pick
+            picks_df = pd.DataFrame([
+                {
+                    'Stock': stock['symbol'].replace('.NS', ''),
+                    'AI Score': stock['score'],
+                    'Reason': stock.get('reason', 'AI recommended')
+                }
+                for stock in top_stocks[:5]
+            ])
+            picks_df.index += 1
+            st.dataframe(
+                picks_df,
+                column_config={"AI Score": st.column_config.NumberColumn(format="%.2f")},
+                use_container_width=True
+            )
         
         st.markdown("---")
         
@@ -632,28 +857,32 @@ if generate_plan and name.strip():
         top_mfs = recommendations.get('top_mutual_funds', [])
         
         if top_mfs:
-            for i, mf in enumerate(top_mfs[:5], 1):
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    st.markdown(f"**{i}. Scheme Code: {mf['code']}**")
-                with col2:
-                    st.metric("Score", f"{mf['score']:.2f}")
+            funds_df = pd.DataFrame([
+                {'Scheme Code': mf['code'], 'Score': mf['score']}
+                for mf in top_mfs[:5]
+            ])
+            funds_df.index += 1
+            st.dataframe(
+                funds_df,
+                column_config={"Score": st.column_config.NumberColumn(format="%.2f")},
+                use_container_width=True
+            )
         
         st.markdown("---")
         
         st.subheader("Investment Strategy")
         strategies = recommendations.get('strategy_suggestions', [])
         
-        for strategy in strategies:
-            st.info(f"{strategy}")
+        if strategies:
+            st.info("\n\n".join(strategies))
         
         st.markdown("---")
         
         st.subheader("Rebalancing Guidelines")
         triggers = recommendations.get('rebalancing_triggers', [])
         
-        for trigger in triggers:
-            st.markdown(f"- {trigger}")
+        if triggers:
+            st.markdown("\n".join(f"- {trigger}" for trigger in triggers))
         
         st.subheader("Action Items")
         st.markdown("""
@@ -667,28 +896,20 @@ if generate_plan and name.strip():
     with tab5:
         st.header("Market Intelligence")
         
-        # Use the same market_data from session state
+        # Use the same cached market_data fetched above
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Live Market Data")
             
             if market_data.get('status') == 'success':
-                st.metric(
-                    "Nifty 50",
-                    f"Rs{market_data.get('nifty_50', 0):,.2f}",
-                    delta=None
-                )
-                st.metric(
-                    "Gold (per 10g)",
-                    f"Rs{market_data.get('gold_price', 0):,.2f}"
-                )
-                
+                nifty = market_data.get('nifty_50') or 0.0
+                gold = market_data.get('gold_price') or 0.0
                 sentiment = market_data.get('market_sentiment', 'Neutral')
-                st.metric(
-                    "Market Sentiment",
-                    sentiment
-                )
+                
+                st.metric("Nifty 50", f"Rs{nifty:,.2f}", delta=None)
+                st.metric("Gold (per 10g)", f"Rs{gold:,.2f}")
+                st.metric("Market Sentiment", sentiment)
                 
                 # Show data source and timestamp
                 st.caption(f"Data source: {market_data.get('data_source', 'Multiple sources')}")
@@ -742,6 +963,7 @@ if generate_plan and name.strip():
                     savings=savings,
                     risk_profile=profile['risk_profile']
                 )
+                _clear_profile_caches()
                 st.success("Profile saved successfully!")
             except Exception as e:
                 st.error(f"Error saving profile: {e}")
@@ -821,28 +1043,28 @@ else:
     
     st.markdown("---")
     
-    # Quick market preview - using session state
+    # Quick market preview - the same market_data name the plan branch uses; only one
+    # branch runs per rerun, so this is the single market-data lookup
     st.subheader(" Quick Market Preview")
     with st.spinner("Fetching live market data from MarketWatch..."):
-        preview_data = get_cached_market_data()
+        market_data = get_cached_market_data()
     
-    if preview_data.get('status') == 'success':
+    if market_data.get('status') == 'success':
+        # Read and format the values once, only when there is something to show
+        nifty = market_data.get('nifty_50') or 0.0
+        gold = market_data.get('gold_price') or 0.0
+        source = market_data.get('data_source', 'Multiple')
+        
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric(
-                "🇮🇳 Nifty 50", 
-                f"₹{preview_data.get('nifty_50', 0):,.2f}"
-            )
+            st.metric("🇮🇳 Nifty 50", f"₹{nifty:,.2f}")
         with col2:
-            st.metric(
-                "🪙 Gold (10g)", 
-                f"₹{preview_data.get('gold_price', 0):,.2f}"
-            )
+            st.metric("🪙 Gold (10g)", f"₹{gold:,.2f}")
         with col3:
-            st.info(f" Source: {preview_data.get('data_source', 'Multiple')}")
+            st.info(f" Source: {source}")
         
         # Show timestamp
-        st.caption(f" Last updated: {preview_data.get('timestamp', 'Unknown')}")
+        st.caption(f" Last updated: {market_data.get('timestamp', 'Unknown')}")
     else:
         st.info(" Market data will be fetched when you generate your investment plan")
     
@@ -864,10 +1086,7 @@ with st.sidebar:
     
     # Add refresh button for market data
     if st.button(" Refresh Market Data", use_container_width=True):
-        if 'market_data' in st.session_state:
-            del st.session_state['market_data']
-        if 'market_data_timestamp' in st.session_state:
-            del st.session_state['market_data_timestamp']
+        get_cached_market_data.clear()
         st.success("Market data will be refreshed on next fetch!")
         st.rerun()
     
@@ -876,12 +1095,11 @@ with st.sidebar:
         **Version**: 2.2 (Session State + MarketWatch)
         **Agents**: 12+ specialized
         **Data Sources**: MarketWatch, Yahoo Finance, GoldAPI
-        **Last Updated**: {datetime.now().strftime('%Y-%m-%d')}
+        **Last Updated**: {_TODAY}
         **Status**:  All systems operational
         
-        **Session Data**:
-        - Market Data Cached: {'Yes' if 'market_data' in st.session_state else 'No'}
-        - Cache Timestamp: {st.session_state.get('market_data_timestamp', 'N/A')}
+        **Market Data**:
+        - Cache: shared across sessions, refreshed every 5 minutes
         """)
     
     with st.expander("Investment Tips"):
@@ -900,9 +1118,9 @@ with st.sidebar:
         1.  MarketWatch (Primary)
         2.  Yahoo Finance (Fallback)
         3.  GoldAPI (Gold prices)
-        4.  Session Cache (Consistent)
+        4.  Shared Cache (Consistent)
         
-        *Data is cached in session state for consistency*
+        *Data is cached server-wide for consistency*
         *Auto-refreshes after 5 minutes*
         *Use refresh button to force update*
         """)
@@ -911,29 +1129,34 @@ if st.session_state.get('show_profiles', False):
     st.markdown("---")
     st.header("Saved User Profiles")
     
-    users = get_all_users()
-    if users:
-        df = pd.DataFrame(
-            users,
-            columns=["ID", "Name", "Income", "Expenses", "Savings", "Risk Profile", "Date"]
-        )
+    # One aggregate query supplies the page count and the statistics below
+    stats = _cached_user_stats()
+    total_users = stats['total']
+    if total_users:
+        # Only the requested page is read from the database and sent to the browser
+        num_pages = -(-total_users // _PROFILE_PAGE_SIZE)
+        page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1, key="profiles_page")
+        df = _cached_users_page((page - 1) * _PROFILE_PAGE_SIZE, _PROFILE_PAGE_SIZE)
         
-        df['Income'] = df['Income'].apply(lambda x: f"₹{x:,.0f}")
-        df['Expenses'] = df['Expenses'].apply(lambda x: f"₹{x:,.0f}")
-        df['Savings'] = df['Savings'].apply(lambda x: f"₹{x:,.0f}")
-        
-        st.dataframe(df, use_container_width=True, hide_index=True)
+        # The Styler formats the currency columns for display and leaves them numeric,
+        # so they still sort by value (NumberColumn's printf format can't add thousands separators)
+        money_format = "₹{:,.0f}"
+        st.dataframe(
+            df.style.format({"Income": money_format, "Expenses": money_format, "Savings": money_format}),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Page {page} of {num_pages} ({total_users} profiles)")
         
         st.subheader(" User Statistics")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Users", len(users))
+            st.metric("Total Users", stats['total'])
         with col2:
-            risk_dist = df['Risk Profile'].value_counts()
-            st.metric("Most Common", risk_dist.index[0] if len(risk_dist) > 0 else "N/A")
+            st.metric("Most Common", stats['most_common_risk'] or "N/A")
         with col3:
-            st.metric("Profiles Today", len([u for u in users if datetime.now().strftime('%Y-%m-%d') in str(u[6])]))
+            st.metric("Profiles Today", stats['today'])
     else:
         st.info("No saved profiles found. Generate your first plan!")
     
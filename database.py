@@ -1,95 +1,117 @@
 # database.py
 import sqlite3
-import os
+import threading
+
+# One connection shared by every call (and every Streamlit session) instead of
+# opening users.db per query. Autocommit mode; the lock serializes access.
+_CONN = sqlite3.connect('users.db', check_same_thread=False, isolation_level=None)
+_CONN.execute('PRAGMA journal_mode=WAL')
+_CONN.execute('PRAGMA synchronous=NORMAL')
+_CONN.execute('PRAGMA temp_store=MEMORY')
+_CONN.execute('PRAGMA cache_size=-64000')
+_CONN.execute('PRAGMA mmap_size=268435456')  # memory-map up to 256 MiB for reads
+_LOCK = threading.Lock()
+
+# Explicit column list (in display order) instead of SELECT *
+_PROFILE_COLUMNS = 'id, name, monthly_income, monthly_expenses, current_savings, risk_profile, timestamp'
 
 def init_db():
     """Initialize the database with the user_profiles table"""
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS user_profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            monthly_income REAL,
-            monthly_expenses REAL,
-            current_savings REAL,
-            risk_profile TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        _CONN.execute('''
+            CREATE TABLE IF NOT EXISTS user_profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                monthly_income REAL,
+                monthly_expenses REAL,
+                current_savings REAL,
+                risk_profile TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Listing orders by timestamp and the stats group by risk profile. SQLite walks
+        # idx_ts backwards for ORDER BY timestamp DESC (rowid breaks ties), so no DESC index is needed
+        _CONN.execute('CREATE INDEX IF NOT EXISTS idx_ts ON user_profiles(timestamp)')
+        _CONN.execute('CREATE INDEX IF NOT EXISTS idx_risk ON user_profiles(risk_profile)')
 
 def insert_user(name, income, expenses, savings, risk_profile):
     """Insert a new user profile into the database"""
-    if not os.path.exists('users.db'):
-        init_db()
-    
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        INSERT INTO user_profiles (name, monthly_income, monthly_expenses, current_savings, risk_profile)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (name, income, expenses, savings, risk_profile))
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        _CONN.execute('''
+            INSERT INTO user_profiles (name, monthly_income, monthly_expenses, current_savings, risk_profile)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (name, income, expenses, savings, risk_profile))
+
+def insert_users(rows):
+    """Insert many (name, income, expenses, savings, risk_profile) rows in one transaction"""
+    with _LOCK:
+        _CONN.execute('BEGIN')
+        try:
+            _CONN.executemany('''
+                INSERT INTO user_profiles (name, monthly_income, monthly_expenses, current_savings, risk_profile)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            _CONN.execute('COMMIT')
+        except BaseException:
+            # Never leave the shared autocommit connection inside an open transaction
+            if _CONN.in_transaction:
+                _CONN.execute('ROLLBACK')
+            raise
 
 def get_all_users():
     """Retrieve all user profiles from database"""
-    if not os.path.exists('users.db'):
-        init_db()
-        return []
-    
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM user_profiles ORDER BY timestamp DESC')
-    users = c.fetchall()
-    conn.close()
-    return users
+    with _LOCK:
+        return _CONN.execute(f'SELECT {_PROFILE_COLUMNS} FROM user_profiles ORDER BY timestamp DESC').fetchall()
+
+def get_users_page(offset, limit):
+    """Retrieve one page of user profiles, newest first"""
+    with _LOCK:
+        return _CONN.execute(
+            f'SELECT {_PROFILE_COLUMNS} FROM user_profiles ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?',
+            (limit, offset)
+        ).fetchall()
+
+def get_user_count():
+    """Count all user profiles"""
+    with _LOCK:
+        return _CONN.execute('SELECT COUNT(*) FROM user_profiles').fetchone()[0]
+
+def get_user_stats():
+    """Profile totals aggregated in SQL: total count, most common risk profile, profiles saved today"""
+    with _LOCK:
+        rows = _CONN.execute('''
+            SELECT risk_profile, COUNT(*),
+                   SUM(CASE WHEN date(timestamp, 'localtime') = date('now', 'localtime') THEN 1 ELSE 0 END)
+            FROM user_profiles
+            GROUP BY risk_profile
+            ORDER BY COUNT(*) DESC
+        ''').fetchall()
+
+    return {
+        'total': sum(count for _, count, _ in rows),
+        'most_common_risk': rows[0][0] if rows else None,
+        'today': sum(today for _, _, today in rows)
+    }
 
 def get_user_by_id(user_id):
     """Retrieve a specific user profile by ID"""
-    if not os.path.exists('users.db'):
-        init_db()
-        return None
-    
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM user_profiles WHERE id = ?', (user_id,))
-    user = c.fetchone()
-    conn.close()
-    return user
+    with _LOCK:
+        return _CONN.execute(f'SELECT {_PROFILE_COLUMNS} FROM user_profiles WHERE id = ?', (user_id,)).fetchone()
 
 def delete_user(user_id):
     """Delete a user profile by ID"""
-    if not os.path.exists('users.db'):
-        init_db()
-        return False
-    
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM user_profiles WHERE id = ?', (user_id,))
-    rows_affected = c.rowcount
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        rows_affected = _CONN.execute('DELETE FROM user_profiles WHERE id = ?', (user_id,)).rowcount
     return rows_affected > 0
 
 def update_user(user_id, name, income, expenses, savings, risk_profile):
     """Update an existing user profile"""
-    if not os.path.exists('users.db'):
-        init_db()
-        return False
-    
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE user_profiles 
-        SET name=?, monthly_income=?, monthly_expenses=?, current_savings=?, risk_profile=?
-        WHERE id=?
-    ''', (name, income, expenses, savings, risk_profile, user_id))
-    rows_affected = c.rowcount
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        rows_affected = _CONN.execute('''
+            UPDATE user_profiles
+            SET name=?, monthly_income=?, monthly_expenses=?, current_savings=?, risk_profile=?
+            WHERE id=?
+        ''', (name, income, expenses, savings, risk_profile, user_id)).rowcount
     return rows_affected > 0
 
 # Initialize database when module is imported
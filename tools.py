@@ -1,6 +1,111 @@
 # tools.py
 import yfinance as yf
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from types import MappingProxyType
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+
+# Pooled keep-alive session for the MF NAV API
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+
+# Gold price proxy: GOLDBEES units x 10 approximates INR per 10g; static price if unavailable
+_GOLD_PROXY_SYMBOL = "GOLDBEES.NS"
+_GOLD_FALLBACK_PRICE = 65000.0
+
+# Model portfolios: percentage of the investable amount per asset class (read-only)
+_PORTFOLIOS = MappingProxyType({
+    "Conservative": MappingProxyType({
+        "Equity Mutual Funds (SIP)": 20,
+        "Debt Funds/FD": 60,
+        "Gold ETF": 10,
+        "Emergency Fund": 10
+    }),
+    "Balanced": MappingProxyType({
+        "Equity Mutual Funds (SIP)": 50,
+        "Debt Funds/FD": 30,
+        "Gold ETF": 15,
+        "Emergency Fund": 5
+    }),
+    "Aggressive": MappingProxyType({
+        "Equity Mutual Funds (SIP)": 60,
+        "Direct Stocks": 15,
+        "Debt Funds": 15,
+        "Gold ETF": 5,
+        "Emergency Fund": 5
+    })
+})
+# Suggested instruments per risk profile (read-only)
+_RECOMMENDATIONS = MappingProxyType({
+    "Conservative": MappingProxyType({
+        "equity_funds": ("SBI Bluechip Fund", "HDFC Top 100 Fund", "ICICI Pru Bluechip Fund"),
+        "debt_funds": ("SBI Magnum Income Fund", "HDFC Corporate Bond Fund", "ICICI Pru Corporate Bond Fund"),
+        "gold_options": ("HDFC Gold ETF", "SBI Gold ETF", "Digital Gold"),
+        "emergency_fund": ("High-yield Savings Account", "Liquid Funds", "Ultra Short Duration Funds")
+    }),
+    "Balanced": MappingProxyType({
+        "equity_funds": ("Parag Parikh Flexi Cap Fund", "HDFC Hybrid Equity Fund", "SBI Equity Hybrid Fund"),
+        "debt_funds": ("HDFC Short Term Debt Fund", "SBI Short Term Debt Fund"),
+        "gold_options": ("GOLDBEES ETF", "HDFC Gold ETF"),
+        "emergency_fund": ("Liquid Funds", "Ultra Short Duration Funds")
+    }),
+    "Aggressive": MappingProxyType({
+        "equity_funds": ("Parag Parikh Flexi Cap", "Mirae Asset Emerging Bluechip", "Axis Small Cap Fund"),
+        "direct_stocks": ("Reliance", "TCS", "HDFC Bank", "Infosys", "ICICI Bank"),
+        "debt_funds": ("HDFC Ultra Short Term Fund",),
+        "gold_options": ("GOLDBEES ETF",)
+    })
+})
+
+# Same tables as (asset names, fractions) for the vectorized allocation
+_PORTFOLIO_WEIGHTS = {
+    profile: (tuple(pcts), np.array(list(pcts.values()), dtype=np.float64) / 100.0)
+    for profile, pcts in _PORTFOLIOS.items()
+}
+
+# Risk profiler scoring tables
+_AGE_CUTOFFS = (30, 40, 55)        # under 30 scores 3, under 40 scores 2, under 55 scores 1
+_HORIZON_CUTOFFS = (2, 5, 10)      # over 10 years scores 3, over 5 scores 2, over 2 scores 1
+_TOLERANCE_SCORES = {"high": 3, "medium": 2, "low": 1}
+# Profile by total score 0-9: 7+ Aggressive, 4-6 Balanced, below 4 Conservative
+_PROFILE_BY_SCORE = ("Conservative",) * 4 + ("Balanced",) * 3 + ("Aggressive",) * 3
+
+
+def _ttl_cache(ttl: float = 300, maxsize: int = 256):
+    """Memoize a price lookup for ttl seconds. Only finite prices above zero are cached."""
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Bind so positional and keyword calls share one cache entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and now - hit[1] < ttl:
+                return hit[0]
+            value = func(*bound.args, **bound.kwargs)
+            if math.isfinite(value) and value > 0:
+                with lock:
+                    if len(cache) >= maxsize:
+                        cache.clear()
+                    cache[key] = (value, now)
+            return value
+        return wrapper
+    return decorator
+
 
 class InvestmentTools:
     """Collection of investment analysis tools"""
@@ -19,43 +124,19 @@ class InvestmentTools:
     @staticmethod
     def risk_profiler(age: int, investment_horizon: int, risk_tolerance: str) -> str:
         """Classify user's risk profile based on age, horizon, and stated tolerance."""
-        score = 0
-        
-        # Age scoring
-        if age < 30:
-            score += 3
-        elif age < 40:
-            score += 2
-        elif age < 55:
-            score += 1
-        
-        # Horizon scoring
-        if investment_horizon > 10:
-            score += 3
-        elif investment_horizon > 5:
-            score += 2
-        elif investment_horizon > 2:
-            score += 1
-        
-        # Risk tolerance scoring
-        if risk_tolerance.lower() == "high":
-            score += 3
-        elif risk_tolerance.lower() == "medium":
-            score += 2
-        elif risk_tolerance.lower() == "low":
-            score += 1
-        
-        # Final classification
-        if score >= 7:
-            return "Aggressive"
-        elif score >= 4:
-            return "Balanced"
-        else:
-            return "Conservative"
+        score = (
+            len(_AGE_CUTOFFS) - bisect.bisect_right(_AGE_CUTOFFS, age)
+            + bisect.bisect_left(_HORIZON_CUTOFFS, investment_horizon)
+            + _TOLERANCE_SCORES.get(risk_tolerance.lower(), 0)
+        )
+        return _PROFILE_BY_SCORE[score]
 
     @staticmethod
+    @_ttl_cache(ttl=300)
     def get_stock_price(symbol: str) -> float:
         """Fetch the current stock price for a given ticker symbol."""
+        # A single one-day history read; yfinance 0.2.40's fast_info['last_price']
+        # would download about a year of bars (history(period="380d")) instead
         try:
             ticker = yf.Ticker(symbol)
             data = ticker.history(period="1d")
@@ -68,11 +149,12 @@ class InvestmentTools:
             return 0.0
 
     @staticmethod
+    @_ttl_cache(ttl=300)
     def get_mf_nav(scheme_code: str) -> float:
         """Fetch the latest NAV for a mutual fund by its AMFI scheme code."""
         try:
             url = f"https://api.mfapi.in/mf/{scheme_code}"
-            response = requests.get(url, timeout=10)
+            response = _SESSION.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
             return float(data['data'][0]['nav'])
@@ -80,80 +162,84 @@ class InvestmentTools:
             print(f"Error fetching MF NAV for {scheme_code}: {e}")
             return 0.0
 
+    @staticmethod
+    def get_many_stock_prices(symbols: list) -> dict:
+        """Fetch current prices for several ticker symbols with one batched download."""
+        if not symbols:
+            return {}
+        prices = {}
+        try:
+            data = yf.download(
+                tickers=" ".join(symbols), period="1d",
+                group_by="ticker", threads=True, progress=False
+            )
+            for symbol in symbols:
+                try:
+                    # A single-symbol download comes back without the ticker level
+                    frame = data[symbol] if data.columns.nlevels > 1 else data
+                    close = frame['Close'].dropna()
+                except KeyError:
+                    close = None
+                prices[symbol] = round(float(close.iloc[-1]), 2) if close is not None and not close.empty else 0.0
+        except Exception as e:
+            print(f"Error fetching stock prices for {symbols}: {e}")
+            return {symbol: 0.0 for symbol in symbols}
+        return prices
+
+    @staticmethod
+    def get_many_mf_nav(scheme_codes: list) -> dict:
+        """Fetch the latest NAVs for several mutual funds concurrently."""
+        if not scheme_codes:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(8, len(scheme_codes))) as executor:
+            navs = executor.map(InvestmentTools.get_mf_nav, scheme_codes)
+            return dict(zip(scheme_codes, navs))
+
     @staticmethod
     def get_gold_price() -> float:
         """Fetch the current price of gold per 10 grams in INR using Gold ETF as proxy."""
         try:
-            # Using GOLDBEES (Gold ETF) as a proxy for gold price
-            gold_etf_price = InvestmentTools.get_stock_price("GOLDBEES.NS")
+            # Using GOLDBEES (Gold ETF) as a proxy for gold price. get_stock_price is
+            # TTL-cached, so repeat calls within a plan are free.
+            gold_etf_price = InvestmentTools.get_stock_price(_GOLD_PROXY_SYMBOL)
             if gold_etf_price > 0:
                 # Convert ETF price to approximate gold price per 10g
                 return round(gold_etf_price * 10, 2)
             else:
                 # Fallback static price if API fails
-                return 65000.0
+                return _GOLD_FALLBACK_PRICE
         except Exception as e:
             print(f"Error fetching gold price: {e}")
-            return 65000.0
+            return _GOLD_FALLBACK_PRICE
 
     @staticmethod
     def recommend_allocation(risk_profile: str, disposable_income: float) -> dict:
-        """Suggest investment allocation based on risk profile and amount available."""
-        portfolios = {
-            "Conservative": {
-                "Equity Mutual Funds (SIP)": 20,
-                "Debt Funds/FD": 60,
-                "Gold ETF": 10,
-                "Emergency Fund": 10
-            },
-            "Balanced": {
-                "Equity Mutual Funds (SIP)": 50,
-                "Debt Funds/FD": 30,
-                "Gold ETF": 15,
-                "Emergency Fund": 5
-            },
-            "Aggressive": {
-                "Equity Mutual Funds (SIP)": 60,
-                "Direct Stocks": 15,
-                "Debt Funds": 15,
-                "Gold ETF": 5,
-                "Emergency Fund": 5
-            }
-        }
+        """
+        Suggest investment allocation based on risk profile and amount available.
+        disposable_income may also be an array of amounts, giving an array per asset.
+        """
+        profile_key = risk_profile if risk_profile in _PORTFOLIOS else "Balanced"
+        chosen_portfolio = _PORTFOLIOS[profile_key]
+        assets, weights = _PORTFOLIO_WEIGHTS[profile_key]
 
-        chosen_portfolio = portfolios.get(risk_profile, portfolios["Balanced"])
-        allocation = {asset: round((percent / 100) * disposable_income, 2) 
-                     for asset, percent in chosen_portfolio.items()}
+        # One broadcast multiply: shape (K,) for a scalar amount, (N, K) for N amounts
+        amounts = np.round(np.multiply.outer(disposable_income, weights), 2)
+        if amounts.ndim == 1:
+            allocation = dict(zip(assets, amounts.tolist()))
+        else:
+            allocation = {asset: amounts[..., i] for i, asset in enumerate(assets)}
         
         return {
             "allocation": allocation,
             "total_amount": disposable_income,
             "portfolio_type": risk_profile,
-            "percentages": chosen_portfolio
+            # Plain copy so callers get an ordinary (mutable, JSON-friendly) dict
+            "percentages": dict(chosen_portfolio)
         }
 
     @staticmethod
     def get_investment_recommendations(risk_profile: str) -> dict:
         """Get specific investment recommendations based on risk profile."""
-        recommendations = {
-            "Conservative": {
-                "equity_funds": ["SBI Bluechip Fund", "HDFC Top 100 Fund", "ICICI Pru Bluechip Fund"],
-                "debt_funds": ["SBI Magnum Income Fund", "HDFC Corporate Bond Fund", "ICICI Pru Corporate Bond Fund"],
-                "gold_options": ["HDFC Gold ETF", "SBI Gold ETF", "Digital Gold"],
-                "emergency_fund": ["High-yield Savings Account", "Liquid Funds", "Ultra Short Duration Funds"]
-            },
-            "Balanced": {
-                "equity_funds": ["Parag Parikh Flexi Cap Fund", "HDFC Hybrid Equity Fund", "SBI Equity Hybrid Fund"],
-                "debt_funds": ["HDFC Short Term Debt Fund", "SBI Short Term Debt Fund"],
-                "gold_options": ["GOLDBEES ETF", "HDFC Gold ETF"],
-                "emergency_fund": ["Liquid Funds", "Ultra Short Duration Funds"]
-            },
-            "Aggressive": {
-                "equity_funds": ["Parag Parikh Flexi Cap", "Mirae Asset Emerging Bluechip", "Axis Small Cap Fund"],
-                "direct_stocks": ["Reliance", "TCS", "HDFC Bank", "Infosys", "ICICI Bank"],
-                "debt_funds": ["HDFC Ultra Short Term Fund"],
-                "gold_options": ["GOLDBEES ETF"]
-            }
-        }
-        
-        return recommendations.get(risk_profile, recommendations["Balanced"])
\ No newline at end of file
+        recommendations = _RECOMMENDATIONS.get(risk_profile, _RECOMMENDATIONS["Balanced"])
+        # Plain dict-of-lists copy, like recommend_allocation's percentages
+        return {category: list(items) for category, items in recommendations.items()}
\ No newline at end of file